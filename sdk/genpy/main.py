@@ -1,4 +1,4 @@
-import json
+import orjson
 from pathlib import Path
 import subprocess
 import os
@@ -8,16 +8,25 @@ idl_path = Path("../../target/idl/redio_contract.json")
 output_path = Path("./contract.json")
 client_name = "../rediopy"
 
+# Fields allowed on an Anchor IdlAccountItem
+_ALLOWED = frozenset({"name", "writable", "signer", "pda", "address"})
+
 def fix_account(account):
     """
-    Fix a single account object to match Anchor IdlAccountItem schema.
+    Fix a single account object in place to match Anchor IdlAccountItem schema.
     """
     if isinstance(account, str):
         return account
 
+    # Nothing to do for accounts that are already clean
+    if (account.keys() <= _ALLOWED and 'writable' in account
+            and 'signer' in account and 'pda' not in account):
+        return account
+
     # Keep only allowed fields
-    allowed_keys = {"name", "writable", "signer", "pda", "address"}
-    account = {k: v for k, v in account.items() if k in allowed_keys}
+    for k in list(account):
+        if k not in _ALLOWED:
+            del account[k]
 
     # Default writable / signer if missing
     account.setdefault('writable', False)
@@ -47,17 +56,18 @@ def fix_idl(idl):
     if 'instructions' in idl:
         for instr in idl['instructions']:
             if 'accounts' in instr:
-                instr['accounts'] = [fix_account(acc) for acc in instr['accounts']]
+                for acc in instr['accounts']:
+                    fix_account(acc)
     return idl
 
 def main():
     try:
         # Load IDL
-        idl = json.loads(idl_path.read_text())
+        idl = orjson.loads(idl_path.read_bytes())
         fixed_idl = fix_idl(idl)
 
         # Save fixed IDL
-        output_path.write_text(json.dumps(fixed_idl, indent=2))
+        output_path.write_bytes(orjson.dumps(fixed_idl, option=orjson.OPT_INDENT_2))
         print(f"Fixed IDL saved to {output_path}")
 
         # Generate Python client using AnchorPy CLI
@@ -1,43 +1,216 @@
-from pydantic import BaseModel, Field
+from typing import Annotated
+import asyncio
+import httpx
+import msgspec
 from solders.pubkey import Pubkey
 from solders.keypair import Keypair
 from solders.instruction import Instruction, AccountMeta
 from solders.system_program import ID as SYS_PROGRAM_ID
 from solders.transaction import Transaction
 from solana.rpc.async_api import AsyncClient
-from solana.rpc.commitment import Confirmed
+from solana.rpc.commitment import Commitment, Confirmed
+from solana.rpc.providers.async_http import AsyncHTTPProvider
+import functools
+import inspect
+import linecache
 import struct
 
+# Instruction payload layouts: 8-byte discriminator followed by the arguments
+_PACK_DISC_U16_U64 = struct.Struct("<8sHQ").pack
+_PACK_DISC_U64 = struct.Struct("<8sQ").pack
+# length prefix of a borsh-encoded string, its bytes are appended after it
+_PACK_DISC_U32 = struct.Struct("<8sI").pack
+
+
+class MerchantPool(msgspec.Struct, frozen=True, gc=False):
+    """Merchant pool state
+
+    The field bounds are enforced by decode_merchant_pool() only, constructing
+    MerchantPool(...) directly does not validate them.
+    """
 
-class MerchantPool(BaseModel):
     merchant: str
     usdc_mint: str
-    commission_rate: int = Field(ge=0, le=10000)
-    total_volume: int = Field(ge=0)
-    total_commissions_paid: int = Field(ge=0)
+    commission_rate: Annotated[int, msgspec.Meta(ge=0, le=10000)]
+    total_volume: Annotated[int, msgspec.Meta(ge=0)]
+    total_commissions_paid: Annotated[int, msgspec.Meta(ge=0)]
     bump: int
     escrow_bump: int
 
 
-class AffiliateAccount(BaseModel):
+class AffiliateAccount(msgspec.Struct, frozen=True, gc=False):
+    """Affiliate account state
+
+    The field bounds are enforced by decode_affiliate_account() only,
+    constructing AffiliateAccount(...) directly does not validate them.
+    """
+
     pool: str
     wallet: str
-    ref_id: str = Field(max_length=32)
-    total_earned: int = Field(ge=0)
-    sales_count: int = Field(ge=0)
+    ref_id: Annotated[str, msgspec.Meta(max_length=32)]
+    total_earned: Annotated[int, msgspec.Meta(ge=0)]
+    sales_count: Annotated[int, msgspec.Meta(ge=0)]
     is_active: bool
     bump: int
     created_at: int
 
 
+_merchant_pool_decoder = msgspec.json.Decoder(MerchantPool)
+_affiliate_account_decoder = msgspec.json.Decoder(AffiliateAccount)
+
+
+def decode_merchant_pool(data: bytes | str) -> MerchantPool:
+    """Decode and validate a merchant pool from its JSON representation
+
+    This is the JSON form of the account (e.g. from an indexer or API), not
+    the borsh-encoded account data stored on chain.
+    """
+    return _merchant_pool_decoder.decode(data)
+
+
+def decode_affiliate_account(data: bytes | str) -> AffiliateAccount:
+    """Decode and validate an affiliate account from its JSON representation
+
+    This is the JSON form of the account (e.g. from an indexer or API), not
+    the borsh-encoded account data stored on chain.
+    """
+    return _affiliate_account_decoder.decode(data)
+
+
+# Program IDs as raw 32-byte keys, base58 form in the comment above each
+# CFQoHeX28aKhpgsLCSGM2zpou6RkRrwRoHVToWS2B6tQ
+_PROGRAM_ID = Pubkey(
+    bytes.fromhex("a721989764c8aff9a4071e2fffd0568d5a609ce0f8d9bbd67f46154c2c3796d9")
+)
+# TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA
+_TOKEN_PID = Pubkey(
+    bytes.fromhex("06ddf6e1d765a193d9cbe146ceeb79ac1cb485ed5f5b37913a8cf5857eff00a9")
+)
+# ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL
+_ATA_PID = Pubkey(
+    bytes.fromhex("8c97258f4e2489f1bb3d1029148e0d830b5a1399daff1084048e7bd8dbe9f859")
+)
+
+# PDA seed prefixes
+_POOL_SEED = b"pool"
+_ESCROW_SEED = b"escrow_authority"
+_AFF_SEED = b"affiliate"
+_TOKEN_PID_BYTES = bytes(_TOKEN_PID)
+
+_PUBKEY_BYTES: dict[Pubkey, bytes] = {}
+
+
+def _pkb(pubkey: Pubkey) -> bytes:
+    """bytes(pubkey), memoized for keys that recur across seed lists"""
+    raw = _PUBKEY_BYTES.get(pubkey)
+    if raw is None:
+        if len(_PUBKEY_BYTES) >= 1024:
+            _PUBKEY_BYTES.clear()
+        raw = _PUBKEY_BYTES[pubkey] = bytes(pubkey)
+    return raw
+
+
+@functools.lru_cache(maxsize=4096)
+def _find_pool_pda(merchant: bytes) -> tuple[Pubkey, int]:
+    return Pubkey.find_program_address([_POOL_SEED, merchant], _PROGRAM_ID)
+
+
+@functools.lru_cache(maxsize=4096)
+def _find_escrow_authority_pda(pool: bytes) -> tuple[Pubkey, int]:
+    return Pubkey.find_program_address([_ESCROW_SEED, pool], _PROGRAM_ID)
+
+
+@functools.lru_cache(maxsize=4096)
+def _find_affiliate_pda(pool: bytes, wallet: bytes) -> tuple[Pubkey, int]:
+    return Pubkey.find_program_address([_AFF_SEED, pool, wallet], _PROGRAM_ID)
+
+
+@functools.lru_cache(maxsize=4096)
+def _find_associated_token_address(owner: bytes, mint: bytes) -> Pubkey:
+    return Pubkey.find_program_address([owner, _TOKEN_PID_BYTES, mint], _ATA_PID)[0]
+
+
+_PDA_CACHES = {
+    "pool": _find_pool_pda,
+    "escrow_authority": _find_escrow_authority_pda,
+    "affiliate": _find_affiliate_pda,
+    "associated_token": _find_associated_token_address,
+}
+
+
+def pda_cache_info() -> dict[str, tuple[int, int, int | None, int]]:
+    """LRU statistics of the PDA derivation caches
+
+    Maps each cache name to a (hits, misses, maxsize, currsize) named tuple.
+    """
+    return {name: fn.cache_info() for name, fn in _PDA_CACHES.items()}
+
+
+def clear_pda_cache() -> None:
+    """Drop all memoized PDA derivations"""
+    for fn in _PDA_CACHES.values():
+        fn.cache_clear()
+    _PUBKEY_BYTES.clear()
+
+
+class _PooledHTTPProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider whose session keeps HTTP/2 connections alive"""
+
+    def __init__(
+        self,
+        endpoint: str,
+        extra_headers: dict[str, str] | None = None,
+        timeout: float = 30,
+        proxy: str | None = None,
+    ):
+        # Skip AsyncHTTPProvider.__init__ so no default session is built
+        super(AsyncHTTPProvider, self).__init__(endpoint, extra_headers, timeout)
+        self.session = httpx.AsyncClient(
+            timeout=timeout,
+            proxy=proxy,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32, keepalive_expiry=60),
+        )
+
+
+class _PooledAsyncClient(AsyncClient):
+    """AsyncClient backed by a _PooledHTTPProvider"""
+
+    def __init__(
+        self,
+        endpoint: str,
+        commitment: Commitment | None = None,
+        timeout: float = 30,
+        extra_headers: dict[str, str] | None = None,
+        proxy: str | None = None,
+    ):
+        # Skip AsyncClient.__init__ so no default provider is built
+        super(AsyncClient, self).__init__(commitment)
+        self._provider = _PooledHTTPProvider(
+            endpoint, extra_headers=extra_headers, timeout=timeout, proxy=proxy
+        )
+
+
+def make_client(
+    rpc_url: str,
+    timeout: float = 30,
+    extra_headers: dict[str, str] | None = None,
+    proxy: str | None = None,
+) -> AsyncClient:
+    """RPC client whose HTTP session keeps connections alive between requests"""
+    # Request and response bodies are (de)serialized by solders' native serde
+    # code rather than the json module, so the JSON side needs no replacement.
+    return _PooledAsyncClient(
+        rpc_url, Confirmed, timeout, extra_headers=extra_headers, proxy=proxy
+    )
+
+
 class RedioContract:
     """Direct interaction with Redio smart contract"""
 
-    PROGRAM_ID = Pubkey.from_string("CFQoHeX28aKhpgsLCSGM2zpou6RkRrwRoHVToWS2B6tQ")
-    TOKEN_PROGRAM_ID = Pubkey.from_string("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")
-    ASSOCIATED_TOKEN_PROGRAM_ID = Pubkey.from_string(
-        "ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL"
-    )
+    PROGRAM_ID = _PROGRAM_ID
+    TOKEN_PROGRAM_ID = _TOKEN_PID
+    ASSOCIATED_TOKEN_PROGRAM_ID = _ATA_PID
 
     DISCRIMINATORS = {
         "initialize_pool": bytes([95, 180, 10, 172, 84, 174, 232, 40]),
@@ -48,98 +221,53 @@ class RedioContract:
         "withdraw_escrow": bytes([81, 84, 226, 128, 245, 47, 96, 104]),
     }
 
-    def __init__(self, rpc_url: str):
-        self.client = AsyncClient(rpc_url, commitment=Confirmed)
+    def __init__(self, rpc_url: str, client: AsyncClient | None = None):
+        self.client = client if client is not None else make_client(rpc_url)
 
     @staticmethod
     def find_pool_pda(merchant: Pubkey) -> tuple[Pubkey, int]:
         """Find merchant pool PDA"""
-        return Pubkey.find_program_address(
-            [b"pool", bytes(merchant)], RedioContract.PROGRAM_ID
-        )
+        return _find_pool_pda(_pkb(merchant))
 
     @staticmethod
     def find_escrow_authority_pda(pool: Pubkey) -> tuple[Pubkey, int]:
         """Find escrow authority PDA"""
-        return Pubkey.find_program_address(
-            [b"escrow_authority", bytes(pool)], RedioContract.PROGRAM_ID
-        )
+        return _find_escrow_authority_pda(_pkb(pool))
 
     @staticmethod
     def find_affiliate_pda(pool: Pubkey, wallet: Pubkey) -> tuple[Pubkey, int]:
         """Find affiliate account PDA"""
-        return Pubkey.find_program_address(
-            [b"affiliate", bytes(pool), bytes(wallet)], RedioContract.PROGRAM_ID
-        )
+        return _find_affiliate_pda(_pkb(pool), _pkb(wallet))
 
     @staticmethod
     def find_associated_token_address(owner: Pubkey, mint: Pubkey) -> Pubkey:
         """Find associated token account address"""
-        return Pubkey.find_program_address(
-            [bytes(owner), bytes(RedioContract.TOKEN_PROGRAM_ID), bytes(mint)],
-            RedioContract.ASSOCIATED_TOKEN_PROGRAM_ID,
-        )[0]
+        return _find_associated_token_address(_pkb(owner), _pkb(mint))
 
+    # Signatures of the instruction builders, _compile_ix below replaces each
+    # body with one generated from _IX_SPEC
     def initialize_pool_ix(
         self,
         merchant: Keypair,
         usdc_mint: Pubkey,
         commission_rate: int,
         initial_deposit: int,
-    ) -> Instruction:
-        """Create initialize_pool instruction"""
-
-        pool_pda, _ = self.find_pool_pda(merchant.pubkey())
-        escrow_authority, _ = self.find_escrow_authority_pda(pool_pda)
-        merchant_usdc = self.find_associated_token_address(merchant.pubkey(), usdc_mint)
-        escrow_usdc = self.find_associated_token_address(escrow_authority, usdc_mint)
-
-        data = self.DISCRIMINATORS["initialize_pool"]
-        data += struct.pack("<H", commission_rate)
-        data += struct.pack("<Q", initial_deposit)
-
-        accounts = [
-            AccountMeta(pubkey=pool_pda, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=merchant.pubkey(), is_signer=True, is_writable=True),
-            AccountMeta(pubkey=merchant_usdc, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=escrow_authority, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=escrow_usdc, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=usdc_mint, is_signer=False, is_writable=False),
-            AccountMeta(
-                pubkey=self.TOKEN_PROGRAM_ID, is_signer=False, is_writable=False
-            ),
-            AccountMeta(
-                pubkey=self.ASSOCIATED_TOKEN_PROGRAM_ID,
-                is_signer=False,
-                is_writable=False,
-            ),
-            AccountMeta(pubkey=SYS_PROGRAM_ID, is_signer=False, is_writable=False),
-        ]
-
-        return Instruction(self.PROGRAM_ID, data, accounts)
+        *,
+        pool_pda: Pubkey | None = None,
+        escrow_authority: Pubkey | None = None,
+        merchant_usdc: Pubkey | None = None,
+        escrow_usdc: Pubkey | None = None,
+    ) -> Instruction: ...
 
     def add_affiliate_ix(
-        self, merchant: Keypair, affiliate_wallet: Pubkey, ref_id: str
-    ) -> Instruction:
-        """Create add_affiliate instruction"""
-
-        pool_pda, _ = self.find_pool_pda(merchant.pubkey())
-        affiliate_pda, _ = self.find_affiliate_pda(pool_pda, affiliate_wallet)
-
-        ref_id_bytes = ref_id.encode("utf-8")
-        data = self.DISCRIMINATORS["add_affiliate"]
-        data += struct.pack("<I", len(ref_id_bytes))
-        data += ref_id_bytes
-
-        accounts = [
-            AccountMeta(pubkey=pool_pda, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=affiliate_pda, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=affiliate_wallet, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=merchant.pubkey(), is_signer=True, is_writable=True),
-            AccountMeta(pubkey=SYS_PROGRAM_ID, is_signer=False, is_writable=False),
-        ]
-
-        return Instruction(self.PROGRAM_ID, data, accounts)
+        self,
+        merchant: Keypair,
+        affiliate_wallet: Pubkey,
+        ref_id: str,
+        *,
+        pool_pda: Pubkey | None = None,
+        affiliate_pda: Pubkey | None = None,
+    ) -> Instruction: ...
 
     def process_sale_ix(
         self,
@@ -148,119 +276,269 @@ class RedioContract:
         affiliate_wallet: Pubkey,
         usdc_mint: Pubkey,
         sale_amount: int,
-    ) -> Instruction:
-        """Create process_sale instruction"""
-
-        pool_pda, _ = self.find_pool_pda(merchant)
-        affiliate_pda, _ = self.find_affiliate_pda(pool_pda, affiliate_wallet)
-        escrow_authority, _ = self.find_escrow_authority_pda(pool_pda)
-        escrow_usdc = self.find_associated_token_address(escrow_authority, usdc_mint)
-        affiliate_usdc = self.find_associated_token_address(affiliate_wallet, usdc_mint)
-
-        data = self.DISCRIMINATORS["process_sale"]
-        data += struct.pack("<Q", sale_amount)
-
-        accounts = [
-            AccountMeta(pubkey=pool_pda, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=affiliate_pda, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=affiliate_wallet, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=escrow_authority, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=escrow_usdc, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=affiliate_usdc, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=usdc_mint, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=authority.pubkey(), is_signer=True, is_writable=True),
-            AccountMeta(
-                pubkey=self.TOKEN_PROGRAM_ID, is_signer=False, is_writable=False
-            ),
-            AccountMeta(
-                pubkey=self.ASSOCIATED_TOKEN_PROGRAM_ID,
-                is_signer=False,
-                is_writable=False,
-            ),
-            AccountMeta(pubkey=SYS_PROGRAM_ID, is_signer=False, is_writable=False),
-        ]
-
-        return Instruction(self.PROGRAM_ID, data, accounts)
+        *,
+        pool_pda: Pubkey | None = None,
+        affiliate_pda: Pubkey | None = None,
+        escrow_authority: Pubkey | None = None,
+        escrow_usdc: Pubkey | None = None,
+        affiliate_usdc: Pubkey | None = None,
+    ) -> Instruction: ...
 
     def remove_affiliate_ix(
-        self, merchant: Keypair, affiliate_wallet: Pubkey
-    ) -> Instruction:
-        """Create remove_affiliate instruction"""
-
-        pool_pda, _ = self.find_pool_pda(merchant.pubkey())
-        affiliate_pda, _ = self.find_affiliate_pda(pool_pda, affiliate_wallet)
-
-        data = self.DISCRIMINATORS["remove_affiliate"]
-
-        accounts = [
-            AccountMeta(pubkey=pool_pda, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=affiliate_pda, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=affiliate_wallet, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=merchant.pubkey(), is_signer=True, is_writable=False),
-        ]
-
-        return Instruction(self.PROGRAM_ID, data, accounts)
+        self,
+        merchant: Keypair,
+        affiliate_wallet: Pubkey,
+        *,
+        pool_pda: Pubkey | None = None,
+        affiliate_pda: Pubkey | None = None,
+    ) -> Instruction: ...
 
     def deposit_escrow_ix(
-        self, merchant: Keypair, usdc_mint: Pubkey, amount: int
-    ) -> Instruction:
-        """Create deposit_escrow instruction"""
-
-        pool_pda, _ = self.find_pool_pda(merchant.pubkey())
-        escrow_authority, _ = self.find_escrow_authority_pda(pool_pda)
-        merchant_usdc = self.find_associated_token_address(merchant.pubkey(), usdc_mint)
-        escrow_usdc = self.find_associated_token_address(escrow_authority, usdc_mint)
-
-        data = self.DISCRIMINATORS["deposit_escrow"]
-        data += struct.pack("<Q", amount)
-
-        accounts = [
-            AccountMeta(pubkey=pool_pda, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=merchant.pubkey(), is_signer=True, is_writable=True),
-            AccountMeta(pubkey=merchant_usdc, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=escrow_authority, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=escrow_usdc, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=usdc_mint, is_signer=False, is_writable=False),
-            AccountMeta(
-                pubkey=self.TOKEN_PROGRAM_ID, is_signer=False, is_writable=False
-            ),
-        ]
-
-        return Instruction(self.PROGRAM_ID, data, accounts)
+        self,
+        merchant: Keypair,
+        usdc_mint: Pubkey,
+        amount: int,
+        *,
+        pool_pda: Pubkey | None = None,
+        escrow_authority: Pubkey | None = None,
+        merchant_usdc: Pubkey | None = None,
+        escrow_usdc: Pubkey | None = None,
+    ) -> Instruction: ...
 
     def withdraw_escrow_ix(
-        self, merchant: Keypair, usdc_mint: Pubkey, amount: int
-    ) -> Instruction:
-        """Create withdraw_escrow instruction"""
-
-        pool_pda, _ = self.find_pool_pda(merchant.pubkey())
-        escrow_authority, _ = self.find_escrow_authority_pda(pool_pda)
-        merchant_usdc = self.find_associated_token_address(merchant.pubkey(), usdc_mint)
-        escrow_usdc = self.find_associated_token_address(escrow_authority, usdc_mint)
-
-        data = self.DISCRIMINATORS["withdraw_escrow"]
-        data += struct.pack("<Q", amount)
-
-        accounts = [
-            AccountMeta(pubkey=pool_pda, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=merchant.pubkey(), is_signer=True, is_writable=True),
-            AccountMeta(pubkey=merchant_usdc, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=escrow_authority, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=escrow_usdc, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=usdc_mint, is_signer=False, is_writable=False),
-            AccountMeta(
-                pubkey=self.TOKEN_PROGRAM_ID, is_signer=False, is_writable=False
-            ),
-        ]
-
-        return Instruction(self.PROGRAM_ID, data, accounts)
-
-    async def send_transaction(self, instruction: Instruction, signer: Keypair) -> str:
-        """Send transaction with instruction"""
+        self,
+        merchant: Keypair,
+        usdc_mint: Pubkey,
+        amount: int,
+        *,
+        pool_pda: Pubkey | None = None,
+        escrow_authority: Pubkey | None = None,
+        merchant_usdc: Pubkey | None = None,
+        escrow_usdc: Pubkey | None = None,
+    ) -> Instruction: ...
+
+    async def send_transaction(
+        self, instruction: Instruction, signer: Keypair, confirm: bool = True
+    ) -> str:
+        """Send transaction with instruction, waiting for confirmation by default"""
         recent_blockhash = (await self.client.get_latest_blockhash()).value.blockhash
 
         tx = Transaction.new_with_payer([instruction], signer.pubkey())
         tx.sign([signer], recent_blockhash=recent_blockhash)
 
         result = await self.client.send_transaction(tx)
+        if confirm:
+            await self.client.confirm_transaction(result.value, commitment=Confirmed)
         return str(result.value)
+
+    async def send_many(
+        self, instructions: list[Instruction], signer: Keypair, confirm: bool = True
+    ) -> list[str]:
+        """Send one transaction per instruction at once, all under one blockhash
+
+        Identical instructions in one batch would sign to identical transactions
+        that the cluster rejects as duplicates, so they must differ.
+        """
+        recent_blockhash = (await self.client.get_latest_blockhash()).value.blockhash
+
+        transactions = []
+        for instruction in instructions:
+            tx = Transaction.new_with_payer([instruction], signer.pubkey())
+            tx.sign([signer], recent_blockhash=recent_blockhash)
+            transactions.append(tx)
+
+        results = await asyncio.gather(
+            *(self.client.send_transaction(tx) for tx in transactions)
+        )
+        signatures = [result.value for result in results]
+        if confirm:
+            await asyncio.gather(
+                *(
+                    self.client.confirm_transaction(signature, commitment=Confirmed)
+                    for signature in signatures
+                )
+            )
+        return [str(signature) for signature in signatures]
+
+
+# Derived accounts of each instruction, computed only when not passed in
+_ESCROW_DERIVED = {
+    "pool_pda": "_pool(_pkb(merchant_pubkey))[0]",
+    "escrow_authority": "_escrow(_pkb(pool_pda))[0]",
+    "merchant_usdc": "_ata(_pkb(merchant_pubkey), _pkb(usdc_mint))",
+    "escrow_usdc": "_ata(_pkb(escrow_authority), _pkb(usdc_mint))",
+}
+_AFFILIATE_DERIVED = {
+    "pool_pda": "_pool(_pkb(merchant_pubkey))[0]",
+    "affiliate_pda": "_affiliate(_pkb(pool_pda), _pkb(affiliate_wallet))[0]",
+}
+_ESCROW_ACCOUNTS = [
+    ("pool_pda", False, False),
+    ("merchant_pubkey", True, True),
+    ("merchant_usdc", False, True),
+    ("escrow_authority", False, False),
+    ("escrow_usdc", False, True),
+    ("usdc_mint", False, False),
+    ("_TOKEN_PID", False, False),
+]
+
+# derived: keyword argument -> expression used when it is None, in evaluation
+#   order; a Keypair argument `x` of the builder is available as `x_pubkey`
+# setup: optional statements run before the payload is built
+# data: payload expression over `_disc` and `_pack`
+# accounts: (expression, is_signer, is_writable) in instruction order
+_IX_SPEC = {
+    "initialize_pool": {
+        "derived": _ESCROW_DERIVED,
+        "pack": _PACK_DISC_U16_U64,
+        "data": "_pack(_disc, commission_rate, initial_deposit)",
+        "accounts": [
+            ("pool_pda", False, True),
+            ("merchant_pubkey", True, True),
+            ("merchant_usdc", False, True),
+            ("escrow_authority", False, False),
+            ("escrow_usdc", False, True),
+            ("usdc_mint", False, False),
+            ("_TOKEN_PID", False, False),
+            ("_ATA_PID", False, False),
+            ("_SYS_PID", False, False),
+        ],
+    },
+    "add_affiliate": {
+        "derived": _AFFILIATE_DERIVED,
+        "pack": _PACK_DISC_U32,
+        "setup": ['ref_id_bytes = ref_id.encode("utf-8")'],
+        "data": "_pack(_disc, len(ref_id_bytes)) + ref_id_bytes",
+        "accounts": [
+            ("pool_pda", False, False),
+            ("affiliate_pda", False, True),
+            ("affiliate_wallet", False, False),
+            ("merchant_pubkey", True, True),
+            ("_SYS_PID", False, False),
+        ],
+    },
+    "process_sale": {
+        "derived": {
+            "pool_pda": "_pool(_pkb(merchant))[0]",
+            "affiliate_pda": "_affiliate(_pkb(pool_pda), _pkb(affiliate_wallet))[0]",
+            "escrow_authority": "_escrow(_pkb(pool_pda))[0]",
+            "escrow_usdc": "_ata(_pkb(escrow_authority), _pkb(usdc_mint))",
+            "affiliate_usdc": "_ata(_pkb(affiliate_wallet), _pkb(usdc_mint))",
+        },
+        "pack": _PACK_DISC_U64,
+        "data": "_pack(_disc, sale_amount)",
+        "accounts": [
+            ("pool_pda", False, True),
+            ("affiliate_pda", False, True),
+            ("affiliate_wallet", False, True),
+            ("escrow_authority", False, False),
+            ("escrow_usdc", False, True),
+            ("affiliate_usdc", False, True),
+            ("usdc_mint", False, False),
+            ("authority_pubkey", True, True),
+            ("_TOKEN_PID", False, False),
+            ("_ATA_PID", False, False),
+            ("_SYS_PID", False, False),
+        ],
+    },
+    "remove_affiliate": {
+        "derived": _AFFILIATE_DERIVED,
+        "pack": None,
+        "data": "_disc",
+        "accounts": [
+            ("pool_pda", False, False),
+            ("affiliate_pda", False, True),
+            ("affiliate_wallet", False, True),
+            ("merchant_pubkey", True, False),
+        ],
+    },
+    "deposit_escrow": {
+        "derived": _ESCROW_DERIVED,
+        "pack": _PACK_DISC_U64,
+        "data": "_pack(_disc, amount)",
+        "accounts": _ESCROW_ACCOUNTS,
+    },
+    "withdraw_escrow": {
+        "derived": _ESCROW_DERIVED,
+        "pack": _PACK_DISC_U64,
+        "data": "_pack(_disc, amount)",
+        "accounts": _ESCROW_ACCOUNTS,
+    },
+}
+
+
+def _compile_ix(name: str, spec: dict):
+    """Generate a straight-line body for one builder declared on RedioContract
+
+    Constants are bound as closure variables of a generated factory so the
+    body does not look them up in module globals. Raises TypeError when the
+    declared keyword arguments and the derived accounts of the spec differ.
+    """
+    bindings = {
+        "_disc": RedioContract.DISCRIMINATORS[name],
+        "_pack": spec["pack"],
+        "_pool": _find_pool_pda,
+        "_escrow": _find_escrow_authority_pda,
+        "_affiliate": _find_affiliate_pda,
+        "_ata": _find_associated_token_address,
+        "_pkb": _pkb,
+        "_AM": AccountMeta,
+        "_Ix": Instruction,
+        "_PID": _PROGRAM_ID,
+        "_TOKEN_PID": _TOKEN_PID,
+        "_ATA_PID": _ATA_PID,
+        "_SYS_PID": SYS_PROGRAM_ID,
+    }
+    # The signature comes from the method declared on RedioContract
+    declared = RedioContract.__dict__[f"{name}_ix"]
+    parameters = list(inspect.signature(declared).parameters.values())[1:]
+    args = [p for p in parameters if p.kind is p.POSITIONAL_OR_KEYWORD]
+    keywords = [p.name for p in parameters if p.kind is p.KEYWORD_ONLY]
+    if len(args) + len(keywords) != len(parameters) or set(keywords) != set(
+        spec["derived"]
+    ):
+        raise TypeError(
+            f"RedioContract.{name}_ix keyword arguments {keywords} do not match"
+            f" the derived accounts {list(spec['derived'])} of _IX_SPEC"
+        )
+
+    lines = [
+        f"def _make({', '.join(bindings)}):",
+        f"    def {name}_ix(self, {', '.join(p.name for p in args)}, *,"
+        f" {', '.join(f'{keyword}=None' for keyword in keywords)}):",
+    ]
+    for arg in args:
+        if arg.annotation is Keypair:
+            lines.append(f"        {arg.name}_pubkey = {arg.name}.pubkey()")
+    for arg, expression in spec["derived"].items():
+        lines.append(f"        if {arg} is None:")
+        lines.append(f"            {arg} = {expression}")
+    lines.extend(f"        {statement}" for statement in spec.get("setup", ()))
+    accounts = ", ".join(
+        f"_AM({expression}, {is_signer}, {is_writable})"
+        for expression, is_signer, is_writable in spec["accounts"]
+    )
+    lines.append(f"        return _Ix(_PID, {spec['data']}, [{accounts}])")
+    lines.append(f"    return {name}_ix")
+    source = "\n".join(lines) + "\n"
+
+    namespace = {}
+    filename = f"<redio {name}_ix>"
+    # keep the generated source around for tracebacks
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    exec(compile(source, filename, "exec"), namespace)
+
+    builder = namespace["_make"](**bindings)
+    builder.__module__ = __name__
+    builder.__qualname__ = f"RedioContract.{name}_ix"
+    builder.__annotations__ = declared.__annotations__
+    builder.__doc__ = (
+        f"Create {name} instruction\n\n"
+        "Already derived accounts can be passed as keywords to skip their lookup."
+    )
+    return builder
+
+
+for _name, _spec in _IX_SPEC.items():
+    setattr(RedioContract, f"{_name}_ix", _compile_ix(_name, _spec))
+del _name, _spec
@@ -0,0 +1,336 @@
+import asyncio
+import inspect
+from types import SimpleNamespace
+
+import httpx
+import msgspec
+import pytest
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+
+from contract import (
+    _IX_SPEC,
+    _PUBKEY_BYTES,
+    RedioContract,
+    _compile_ix,
+    clear_pda_cache,
+    decode_affiliate_account,
+    decode_merchant_pool,
+    make_client,
+    pda_cache_info,
+)
+
+MERCHANT_POOL_JSON = {
+    "merchant": "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU",
+    "usdc_mint": "4zMMC9srt5Ri5X14GAgXhaHii3GnPAEERYPJgZJDncDU",
+    "commission_rate": 1000,
+    "total_volume": 50_000_000,
+    "total_commissions_paid": 5_000_000,
+    "bump": 254,
+    "escrow_bump": 253,
+}
+
+AFFILIATE_ACCOUNT_JSON = {
+    "pool": "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU",
+    "wallet": "4zMMC9srt5Ri5X14GAgXhaHii3GnPAEERYPJgZJDncDU",
+    "ref_id": "AFF001",
+    "total_earned": 5_000_000,
+    "sales_count": 1,
+    "is_active": True,
+    "bump": 255,
+    "created_at": 1_700_000_000,
+}
+
+
+def test_decode_merchant_pool():
+    """Valid merchant pool JSON decodes into a MerchantPool"""
+    pool = decode_merchant_pool(msgspec.json.encode(MERCHANT_POOL_JSON))
+
+    assert pool.commission_rate == 1000
+    assert pool.total_commissions_paid == 5_000_000
+    assert pool.escrow_bump == 253
+
+
+def test_decode_merchant_pool_rejects_invalid_rate():
+    """Commission rates above 100% are rejected when decoding"""
+    data = msgspec.json.encode({**MERCHANT_POOL_JSON, "commission_rate": 10001})
+
+    with pytest.raises(msgspec.ValidationError, match="commission_rate"):
+        decode_merchant_pool(data)
+
+
+def test_decode_affiliate_account():
+    """Valid affiliate account JSON decodes into an AffiliateAccount"""
+    affiliate = decode_affiliate_account(msgspec.json.encode(AFFILIATE_ACCOUNT_JSON))
+
+    assert affiliate.ref_id == "AFF001"
+    assert affiliate.is_active
+
+
+def test_decode_affiliate_account_rejects_long_ref_id():
+    """ref_id longer than 32 characters is rejected when decoding"""
+    data = msgspec.json.encode({**AFFILIATE_ACCOUNT_JSON, "ref_id": "A" * 33})
+
+    with pytest.raises(msgspec.ValidationError, match="ref_id"):
+        decode_affiliate_account(data)
+
+
+# Fixed keys, the expected instructions below match the original hand-written
+# builders for them
+MERCHANT = Keypair.from_seed(bytes([1]) * 32)
+AUTHORITY = Keypair.from_seed(bytes([4]) * 32)
+AFFILIATE = Keypair.from_seed(bytes([2]) * 32).pubkey()
+MINT = Keypair.from_seed(bytes([3]) * 32).pubkey()
+
+POOL_PDA = "B5FobAi5f5zaVqjxaWFduWF5sLg2tbryp76JTJWyvN9S"
+ESCROW_AUTHORITY = "4Au6Z6yCrejudeCWGxJd4dnKwizE5GjiWX3yvVpuT5FB"
+AFFILIATE_PDA = "AzuhW4gLotbuD9jCaTkwpXqCtJDMDgJpHKsa8EsdMrca"
+MERCHANT_USDC = "JAYwnTWS9z44Bv3N3otEHihbKfMLzTwwskqhWc9n5qii"
+ESCROW_USDC = "6nNh5kZPiGjY5mzrUmn9cxkTTJNJagNQqzRRrqqjgz6Q"
+AFFILIATE_USDC = "13KoHDCDXebtaN59JpGpQCmhsk8u7qk9H9FFSCMyynLh"
+TOKEN_PID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+ATA_PID = "ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL"
+SYS_PID = "11111111111111111111111111111111"
+
+ESCROW_KEYWORDS = {
+    "pool_pda": POOL_PDA,
+    "escrow_authority": ESCROW_AUTHORITY,
+    "merchant_usdc": MERCHANT_USDC,
+    "escrow_usdc": ESCROW_USDC,
+}
+AFFILIATE_KEYWORDS = {"pool_pda": POOL_PDA, "affiliate_pda": AFFILIATE_PDA}
+ESCROW_ACCOUNTS = [
+    (POOL_PDA, False, False),
+    (str(MERCHANT.pubkey()), True, True),
+    (MERCHANT_USDC, False, True),
+    (ESCROW_AUTHORITY, False, False),
+    (ESCROW_USDC, False, True),
+    (str(MINT), False, False),
+    (TOKEN_PID, False, False),
+]
+
+# (builder, args, derived keywords, data hex, accounts)
+INSTRUCTIONS = {
+    "initialize_pool": (
+        "initialize_pool_ix",
+        (MERCHANT, MINT, 1000, 50_000_000),
+        ESCROW_KEYWORDS,
+        "5fb40aac54aee828e80380f0fa0200000000",
+        [
+            (POOL_PDA, False, True),
+            (str(MERCHANT.pubkey()), True, True),
+            (MERCHANT_USDC, False, True),
+            (ESCROW_AUTHORITY, False, False),
+            (ESCROW_USDC, False, True),
+            (str(MINT), False, False),
+            (TOKEN_PID, False, False),
+            (ATA_PID, False, False),
+            (SYS_PID, False, False),
+        ],
+    ),
+    "add_affiliate": (
+        "add_affiliate_ix",
+        (MERCHANT, AFFILIATE, "AFF001"),
+        AFFILIATE_KEYWORDS,
+        "ddef3c9fd52ddd5706000000414646303031",
+        [
+            (POOL_PDA, False, False),
+            (AFFILIATE_PDA, False, True),
+            (str(AFFILIATE), False, False),
+            (str(MERCHANT.pubkey()), True, True),
+            (SYS_PID, False, False),
+        ],
+    ),
+    "process_sale": (
+        "process_sale_ix",
+        (AUTHORITY, MERCHANT.pubkey(), AFFILIATE, MINT, 50_000_000),
+        {
+            "pool_pda": POOL_PDA,
+            "affiliate_pda": AFFILIATE_PDA,
+            "escrow_authority": ESCROW_AUTHORITY,
+            "escrow_usdc": ESCROW_USDC,
+            "affiliate_usdc": AFFILIATE_USDC,
+        },
+        "67e4f8684e2ec15280f0fa0200000000",
+        [
+            (POOL_PDA, False, True),
+            (AFFILIATE_PDA, False, True),
+            (str(AFFILIATE), False, True),
+            (ESCROW_AUTHORITY, False, False),
+            (ESCROW_USDC, False, True),
+            (AFFILIATE_USDC, False, True),
+            (str(MINT), False, False),
+            (str(AUTHORITY.pubkey()), True, True),
+            (TOKEN_PID, False, False),
+            (ATA_PID, False, False),
+            (SYS_PID, False, False),
+        ],
+    ),
+    "remove_affiliate": (
+        "remove_affiliate_ix",
+        (MERCHANT, AFFILIATE),
+        AFFILIATE_KEYWORDS,
+        "92dab67a7601451f",
+        [
+            (POOL_PDA, False, False),
+            (AFFILIATE_PDA, False, True),
+            (str(AFFILIATE), False, True),
+            (str(MERCHANT.pubkey()), True, False),
+        ],
+    ),
+    "deposit_escrow": (
+        "deposit_escrow_ix",
+        (MERCHANT, MINT, 25_000_000),
+        ESCROW_KEYWORDS,
+        "e2709eb0b276998040787d0100000000",
+        ESCROW_ACCOUNTS,
+    ),
+    "withdraw_escrow": (
+        "withdraw_escrow_ix",
+        (MERCHANT, MINT, 10_000_000),
+        ESCROW_KEYWORDS,
+        "5154e280f52f60688096980000000000",
+        ESCROW_ACCOUNTS,
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def contract():
+    """RedioContract on a dummy endpoint, instruction builders never connect"""
+    return RedioContract("http://127.0.0.1:8899")
+
+
+@pytest.mark.parametrize("pass_derived", [False, True], ids=["derive", "keywords"])
+@pytest.mark.parametrize("name", list(INSTRUCTIONS))
+def test_instruction_layout(contract, name, pass_derived):
+    """Instruction data and accounts match the expected layout"""
+    builder, args, derived, data, accounts = INSTRUCTIONS[name]
+    kwargs = {}
+    if pass_derived:
+        kwargs = {arg: Pubkey.from_string(key) for arg, key in derived.items()}
+
+    ix = getattr(contract, builder)(*args, **kwargs)
+
+    assert ix.program_id == RedioContract.PROGRAM_ID
+    assert bytes(ix.data).hex() == data
+    assert [
+        (str(meta.pubkey), meta.is_signer, meta.is_writable) for meta in ix.accounts
+    ] == accounts
+
+
+@pytest.mark.parametrize("name", list(_IX_SPEC))
+def test_instruction_signature(name):
+    """Builder keyword arguments are exactly the derived accounts of _IX_SPEC"""
+    builder = getattr(RedioContract, f"{name}_ix")
+    parameters = list(inspect.signature(builder).parameters.values())
+    positional = [p for p in parameters if p.kind is p.POSITIONAL_OR_KEYWORD]
+    keywords = [p for p in parameters if p.kind is p.KEYWORD_ONLY]
+
+    assert positional[0].name == "self"
+    assert len(positional) + len(keywords) == len(parameters)
+    assert [p.name for p in keywords] == list(_IX_SPEC[name]["derived"])
+    assert all(p.default is None for p in keywords)
+    assert all(p.annotation == Pubkey | None for p in keywords)
+    assert len(positional) - 1 == len(INSTRUCTIONS[name][1])
+
+
+def test_compile_ix_rejects_mismatched_spec():
+    """A spec whose derived accounts differ from the signature fails to compile"""
+    spec = _IX_SPEC["remove_affiliate"]
+    derived = {"pool_pda": spec["derived"]["pool_pda"]}
+
+    with pytest.raises(TypeError, match="affiliate_pda"):
+        _compile_ix("remove_affiliate", {**spec, "derived": derived})
+
+
+def test_make_client_pooled_session():
+    """make_client builds a keepalive HTTP/2 session with the given settings
+
+    The provider is built around solana-py's constructors, so this catches a
+    solana upgrade that changes them.
+    """
+    client = make_client(
+        "http://127.0.0.1:8899", timeout=3, extra_headers={"X-Test": "1"}
+    )
+    provider = client._provider
+
+    assert provider.timeout == 3
+    assert provider._build_common_request_kwargs()["headers"]["X-Test"] == "1"
+    assert isinstance(provider.session, httpx.AsyncClient)
+    assert provider.session.timeout == httpx.Timeout(3)
+
+    pool = provider.session._transport._pool
+    assert pool._http2
+    assert pool._max_keepalive_connections == 32
+    assert pool._keepalive_expiry == 60
+
+
+class StubClient:
+    """Records the RPC calls made by RedioContract.send_many"""
+
+    def __init__(self):
+        self.blockhash_calls = 0
+        self.sent = []
+        self.confirmed = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_latest_blockhash(self):
+        self.blockhash_calls += 1
+        return SimpleNamespace(value=SimpleNamespace(blockhash=Hash.new_unique()))
+
+    async def send_transaction(self, tx):
+        self.sent.append(tx)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        return SimpleNamespace(value=tx.signatures[0])
+
+    async def confirm_transaction(self, signature, commitment=None):
+        self.confirmed.append(signature)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("confirm", [True, False])
+async def test_send_many(confirm):
+    """send_many fetches one blockhash per batch and sends every instruction"""
+    client = StubClient()
+    contract = RedioContract("http://127.0.0.1:8899", client=client)
+    instructions = [
+        contract.deposit_escrow_ix(MERCHANT, MINT, amount) for amount in (1, 2, 3)
+    ]
+
+    signatures = await contract.send_many(instructions, MERCHANT, confirm=confirm)
+
+    assert client.blockhash_calls == 1
+    assert client.max_in_flight == len(instructions)
+    assert len({tx.message.recent_blockhash for tx in client.sent}) == 1
+    assert signatures == [str(tx.signatures[0]) for tx in client.sent]
+    assert len(set(signatures)) == len(instructions)
+    assert [bytes(tx.message.instructions[0].data) for tx in client.sent] == [
+        bytes(ix.data) for ix in instructions
+    ]
+    assert len(client.confirmed) == (len(instructions) if confirm else 0)
+
+
+def test_pda_cache_info():
+    """Repeated builds hit the PDA caches and clear_pda_cache empties them"""
+    clear_pda_cache()
+    contract = RedioContract("http://127.0.0.1:8899")
+
+    contract.deposit_escrow_ix(MERCHANT, MINT, 1)
+    contract.deposit_escrow_ix(MERCHANT, MINT, 2)
+
+    info = pda_cache_info()
+    assert (info["pool"].hits, info["pool"].misses) == (1, 1)
+    assert (info["escrow_authority"].hits, info["escrow_authority"].misses) == (1, 1)
+    assert (info["associated_token"].hits, info["associated_token"].misses) == (2, 2)
+    assert _PUBKEY_BYTES
+
+    clear_pda_cache()
+
+    assert all(stats.currsize == 0 for stats in pda_cache_info().values())
+    assert not _PUBKEY_BYTES
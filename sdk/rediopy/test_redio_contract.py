@@ -4,15 +4,13 @@ import asyncio
 from solders.pubkey import Pubkey
 from solders.keypair import Keypair
 from solders.system_program import ID as SYS_PROGRAM_ID
-from solana.rpc.async_api import AsyncClient
-from solana.rpc.commitment import Confirmed
 from solana.rpc.types import TxOpts
 from spl.token.async_client import AsyncToken
 from spl.token.constants import TOKEN_PROGRAM_ID
 from spl.token.instructions import get_associated_token_address, create_associated_token_account
 import time
 
-from contract import RedioContract
+from contract import RedioContract, make_client
 
 
 REF_ID = "AFF001"
@@ -22,14 +20,48 @@ SALE_AMOUNT = 50_000_000  # 50 USDC
 EXPECTED_COMMISSION = 5_000_000  # 5 USDC (10% of 50)
 
 
+async def create_mint_ixs(client, payer, mint_keypair):
+    """Instructions creating a 6 decimal mint whose authority is payer"""
+    from spl.token.instructions import initialize_mint, InitializeMintParams
+    from solders.system_program import create_account, CreateAccountParams
+    
+    mint_rent = await client.get_minimum_balance_for_rent_exemption(82)
+    
+    create_mint_ix = create_account(
+        CreateAccountParams(
+            from_pubkey=payer.pubkey(),
+            to_pubkey=mint_keypair.pubkey(),
+            lamports=mint_rent.value,
+            space=82,
+            owner=TOKEN_PROGRAM_ID
+        )
+    )
+    
+    init_mint_ix = initialize_mint(
+        InitializeMintParams(
+            program_id=TOKEN_PROGRAM_ID,
+            mint=mint_keypair.pubkey(),
+            decimals=6,
+            mint_authority=payer.pubkey(),
+            freeze_authority=None
+        )
+    )
+    
+    return [create_mint_ix, init_mint_ix]
+
+
+# Tests that build on the pool created in test_01 share the "pool" xdist group so
+# they stay on one worker in order. Independent tests use function-scoped
+# fixtures instead, so they run on another worker without the module setup:
+#   pytest -n 2 --dist loadgroup
 @pytest_asyncio.fixture(scope="module")
 async def test_context():
-    """Setup test environment - runs once for all tests"""
+    """Setup test environment - runs once for all tests (once per xdist worker)"""
     print("\n🔧 Setting up test environment...")
     
     # Connect to local validator
-    client = AsyncClient("http://localhost:8899", commitment=Confirmed)
-    contract = RedioContract("http://localhost:8899")
+    client = make_client("http://localhost:8899")
+    contract = RedioContract("http://localhost:8899", client=client)
     
     # Generate keypairs
     merchant = Keypair()
@@ -51,8 +83,7 @@ async def test_context():
     signatures = await asyncio.gather(*airdrop_tasks)
     
     # Confirm airdrops
-    for sig in signatures:
-        await client.confirm_transaction(sig.value)
+    await asyncio.gather(*(client.confirm_transaction(sig.value) for sig in signatures))
     
     print("✓ Airdropped 2 SOL to each account")
     
@@ -60,42 +91,11 @@ async def test_context():
     mint_keypair = Keypair()
     
     # Create mint using spl-token
-    from spl.token.instructions import initialize_mint, InitializeMintParams
     from solders.transaction import Transaction
-    from solders.system_program import create_account, CreateAccountParams
-    
-    # Create mint account
-    mint_rent = await client.get_minimum_balance_for_rent_exemption(82)
-    
-    create_mint_ix = create_account(
-        CreateAccountParams(
-            from_pubkey=merchant.pubkey(),
-            to_pubkey=mint_keypair.pubkey(),
-            lamports=mint_rent.value,
-            space=82,
-            owner=TOKEN_PROGRAM_ID
-        )
-    )
-    
-    init_mint_ix = initialize_mint(
-        InitializeMintParams(
-            program_id=TOKEN_PROGRAM_ID,
-            mint=mint_keypair.pubkey(),
-            decimals=6,
-            mint_authority=merchant.pubkey(),
-            freeze_authority=None
-        )
-    )
     
-    recent_blockhash = (await client.get_latest_blockhash()).value.blockhash
-    tx = Transaction.new_with_payer([create_mint_ix, init_mint_ix], merchant.pubkey())
-    tx.sign([merchant, mint_keypair],recent_blockhash = recent_blockhash)
-    
-    result = await client.send_transaction(tx, opts=TxOpts(skip_preflight=True))
-    await client.confirm_transaction(result.value)
+    mint_ixs = await create_mint_ixs(client, merchant, mint_keypair)
     
     usdc_mint = mint_keypair.pubkey()
-    print(f"✓ Created test USDC mint: {usdc_mint}")
     
     # Create associated token accounts
     merchant_usdc = get_associated_token_address(merchant.pubkey(), usdc_mint)
@@ -108,13 +108,6 @@ async def test_context():
         mint=usdc_mint
     )
     
-    recent_blockhash = (await client.get_latest_blockhash()).value.blockhash
-    tx = Transaction.new_with_payer([create_merchant_ata], merchant.pubkey())
-    tx.sign([merchant], recent_blockhash = recent_blockhash)
-    
-    await client.send_transaction(tx, opts=TxOpts(skip_preflight=True))
-    await asyncio.sleep(1)
-    
     # Create affiliate token account
     create_affiliate_ata = create_associated_token_account(
         payer=affiliate.pubkey(),
@@ -122,13 +115,6 @@ async def test_context():
         mint=usdc_mint
     )
     
-    recent_blockhash = (await client.get_latest_blockhash()).value.blockhash
-    tx = Transaction.new_with_payer([create_affiliate_ata], affiliate.pubkey())
-    tx.sign([affiliate,],recent_blockhash = recent_blockhash)
-    
-    await client.send_transaction(tx, opts=TxOpts(skip_preflight=True))
-    await asyncio.sleep(1)
-    
     # Mint tokens to merchant
     from spl.token.instructions import mint_to, MintToParams
     
@@ -143,13 +129,19 @@ async def test_context():
         )
     )
     
+    # The ATAs and mint_to need the mint to exist, so everything goes into a
+    # single transaction where instructions execute in order
     recent_blockhash = (await client.get_latest_blockhash()).value.blockhash
-    tx = Transaction.new_with_payer([mint_ix], merchant.pubkey())
-    tx.sign([merchant], recent_blockhash = recent_blockhash)
+    tx = Transaction.new_with_payer(
+        [*mint_ixs, create_merchant_ata, create_affiliate_ata, mint_ix],
+        merchant.pubkey()
+    )
+    tx.sign([merchant, mint_keypair, affiliate], recent_blockhash = recent_blockhash)
     
-    await client.send_transaction(tx, opts=TxOpts(skip_preflight=True))
-    await asyncio.sleep(1)
+    result = await client.send_transaction(tx, opts=TxOpts(skip_preflight=True))
+    await client.confirm_transaction(result.value)
     
+    print(f"✓ Created test USDC mint: {usdc_mint}")
     print("✓ Minted 1000 USDC to merchant")
     
     # Derive PDAs
@@ -183,6 +175,7 @@ async def test_context():
 
 
 @pytest.mark.asyncio
+@pytest.mark.xdist_group("pool")
 async def test_01_initialize_pool(test_context):
     """Test pool initialization with initial deposit"""
     ctx = test_context
@@ -193,11 +186,14 @@ async def test_01_initialize_pool(test_context):
         merchant=ctx["merchant"],
         usdc_mint=ctx["usdc_mint"],
         commission_rate=COMMISSION_RATE,
-        initial_deposit=INITIAL_DEPOSIT
+        initial_deposit=INITIAL_DEPOSIT,
+        pool_pda=ctx["merchant_pool_pda"],
+        escrow_authority=ctx["escrow_authority_pda"],
+        merchant_usdc=ctx["merchant_usdc"],
+        escrow_usdc=ctx["escrow_usdc"]
     )
     
     signature = await ctx["contract"].send_transaction(ix, ctx["merchant"])
-    await asyncio.sleep(2)  # Wait for confirmation
     
     print(f"✓ Pool initialized: {signature}")
     
@@ -213,19 +209,48 @@ async def test_01_initialize_pool(test_context):
     print(f"✓ Escrow balance: {escrow_balance / 1_000_000} USDC")
 
 
+@pytest_asyncio.fixture
+async def invalid_rate_context():
+    """Funded merchant and its own mint, independent of the shared pool"""
+    from solders.transaction import Transaction
+    
+    client = make_client("http://localhost:8899")
+    contract = RedioContract("http://localhost:8899", client=client)
+    
+    merchant = Keypair()
+    mint_keypair = Keypair()
+    
+    sig = await client.request_airdrop(merchant.pubkey(), 1_000_000_000)
+    await client.confirm_transaction(sig.value)
+    
+    recent_blockhash = (await client.get_latest_blockhash()).value.blockhash
+    tx = Transaction.new_with_payer(
+        await create_mint_ixs(client, merchant, mint_keypair),
+        merchant.pubkey()
+    )
+    tx.sign([merchant, mint_keypair], recent_blockhash = recent_blockhash)
+    
+    result = await client.send_transaction(tx, opts=TxOpts(skip_preflight=True))
+    await client.confirm_transaction(result.value)
+    
+    yield {
+        "client": client,
+        "contract": contract,
+        "merchant": merchant,
+        "usdc_mint": mint_keypair.pubkey(),
+    }
+    
+    await client.close()
+
+
 @pytest.mark.asyncio
-async def test_02_initialize_pool_invalid_rate(test_context):
+async def test_02_initialize_pool_invalid_rate(invalid_rate_context):
     """Test pool initialization fails with invalid commission rate"""
-    ctx = test_context
+    ctx = invalid_rate_context
     
     print("\n❌ Test: Invalid Commission Rate")
     
-    invalid_merchant = Keypair()
-    
-    # Airdrop to invalid merchant
-    sig = await ctx["client"].request_airdrop(invalid_merchant.pubkey(), 1_000_000_000)
-    await ctx["client"].confirm_transaction(sig.value)
-    await asyncio.sleep(1)
+    invalid_merchant = ctx["merchant"]
     
     ix = ctx["contract"].initialize_pool_ix(
         merchant=invalid_merchant,
@@ -236,7 +261,6 @@ async def test_02_initialize_pool_invalid_rate(test_context):
     
     try:
         signature = await ctx["contract"].send_transaction(ix, invalid_merchant)
-        await asyncio.sleep(1)
         pytest.fail("Should have thrown error")
     except Exception as e:
         print(f"✓ Rejected invalid commission rate")
@@ -245,6 +269,7 @@ async def test_02_initialize_pool_invalid_rate(test_context):
 
 
 @pytest.mark.asyncio
+@pytest.mark.xdist_group("pool")
 async def test_03_add_affiliate(test_context):
     """Test adding an affiliate"""
     ctx = test_context
@@ -254,11 +279,12 @@ async def test_03_add_affiliate(test_context):
     ix = ctx["contract"].add_affiliate_ix(
         merchant=ctx["merchant"],
         affiliate_wallet=ctx["affiliate"].pubkey(),
-        ref_id=REF_ID
+        ref_id=REF_ID,
+        pool_pda=ctx["merchant_pool_pda"],
+        affiliate_pda=ctx["affiliate_pda"]
     )
     
     signature = await ctx["contract"].send_transaction(ix, ctx["merchant"])
-    await asyncio.sleep(2)
     
     print(f"✓ Affiliate added: {signature}")
     
@@ -269,6 +295,7 @@ async def test_03_add_affiliate(test_context):
 
 
 @pytest.mark.asyncio
+@pytest.mark.xdist_group("pool")
 async def test_04_process_sale(test_context):
     """Test processing a sale and paying commission"""
     ctx = test_context
@@ -284,11 +311,15 @@ async def test_04_process_sale(test_context):
         merchant=ctx["merchant"].pubkey(),
         affiliate_wallet=ctx["affiliate"].pubkey(),
         usdc_mint=ctx["usdc_mint"],
-        sale_amount=SALE_AMOUNT
+        sale_amount=SALE_AMOUNT,
+        pool_pda=ctx["merchant_pool_pda"],
+        affiliate_pda=ctx["affiliate_pda"],
+        escrow_authority=ctx["escrow_authority_pda"],
+        escrow_usdc=ctx["escrow_usdc"],
+        affiliate_usdc=ctx["affiliate_usdc"]
     )
     
     signature = await ctx["contract"].send_transaction(ix, ctx["backend"])
-    await asyncio.sleep(2)
     
     print(f"✓ Sale processed: {signature}")
     
@@ -305,6 +336,7 @@ async def test_04_process_sale(test_context):
 
 
 @pytest.mark.asyncio
+@pytest.mark.xdist_group("pool")
 async def test_05_deposit_escrow(test_context):
     """Test depositing to escrow"""
     ctx = test_context
@@ -320,11 +352,14 @@ async def test_05_deposit_escrow(test_context):
     ix = ctx["contract"].deposit_escrow_ix(
         merchant=ctx["merchant"],
         usdc_mint=ctx["usdc_mint"],
-        amount=DEPOSIT_AMOUNT
+        amount=DEPOSIT_AMOUNT,
+        pool_pda=ctx["merchant_pool_pda"],
+        escrow_authority=ctx["escrow_authority_pda"],
+        merchant_usdc=ctx["merchant_usdc"],
+        escrow_usdc=ctx["escrow_usdc"]
     )
     
     signature = await ctx["contract"].send_transaction(ix, ctx["merchant"])
-    await asyncio.sleep(2)
     
     print(f"✓ Deposited: {signature}")
     
@@ -339,6 +374,7 @@ async def test_05_deposit_escrow(test_context):
 
 
 @pytest.mark.asyncio
+@pytest.mark.xdist_group("pool")
 async def test_06_withdraw_escrow(test_context):
     """Test withdrawing from escrow"""
     ctx = test_context
@@ -354,11 +390,14 @@ async def test_06_withdraw_escrow(test_context):
     ix = ctx["contract"].withdraw_escrow_ix(
         merchant=ctx["merchant"],
         usdc_mint=ctx["usdc_mint"],
-        amount=WITHDRAW_AMOUNT
+        amount=WITHDRAW_AMOUNT,
+        pool_pda=ctx["merchant_pool_pda"],
+        escrow_authority=ctx["escrow_authority_pda"],
+        merchant_usdc=ctx["merchant_usdc"],
+        escrow_usdc=ctx["escrow_usdc"]
     )
     
     signature = await ctx["contract"].send_transaction(ix, ctx["merchant"])
-    await asyncio.sleep(2)
     
     print(f"✓ Withdrawn: {signature}")
     
@@ -373,6 +412,7 @@ async def test_06_withdraw_escrow(test_context):
 
 
 @pytest.mark.asyncio
+@pytest.mark.xdist_group("pool")
 async def test_07_remove_affiliate(test_context):
     """Test deactivating an affiliate"""
     ctx = test_context
@@ -381,11 +421,12 @@ async def test_07_remove_affiliate(test_context):
     
     ix = ctx["contract"].remove_affiliate_ix(
         merchant=ctx["merchant"],
-        affiliate_wallet=ctx["affiliate"].pubkey()
+        affiliate_wallet=ctx["affiliate"].pubkey(),
+        pool_pda=ctx["merchant_pool_pda"],
+        affiliate_pda=ctx["affiliate_pda"]
     )
     
     signature = await ctx["contract"].send_transaction(ix, ctx["merchant"])
-    await asyncio.sleep(2)
     
     print(f"✓ Affiliate deactivated: {signature}")
     
@@ -49,6 +49,8 @@ if [ $? -eq 0 ]; then
     echo ""
     echo "Now you can run the tests with:"
     echo "  uv run pytest test_redio_contract.py -v -s"
+    echo "or in parallel with:"
+    echo "  uv run pytest test_redio_contract.py -v -n 2 --dist loadgroup"
 else
     echo "❌ Failed to deploy program"
     exit 1